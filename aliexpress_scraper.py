@@ -1,11 +1,13 @@
 import csv
-from bs4 import BeautifulSoup
+from collections import defaultdict
+from lxml import html as lhtml
+from lxml.etree import XPath
 import re
-from datetime import datetime
 
 # Configuración de archivos
 INPUT_FILE = 'aliexpress.txt'
 OUTPUT_FILE = 'gastos_aliexpress.csv'
+FIELDNAMES = ('Fecha', 'Proveedor', 'Importe', 'Concepto', 'Referencia', 'Metodo')
 
 # Mapeo de meses en español a números para formatear la fecha
 MESES = {
@@ -13,6 +15,28 @@ MESES = {
     'jul': '07', 'ago': '08', 'sep': '09', 'oct': '10', 'nov': '11', 'dic': '12'
 }
 
+# Patrones precompilados (se usan una vez por pedido)
+_RE_CURRENCY = re.compile(r'[€$£USCHFzł\s]')
+_RE_DATE_ES = re.compile(r'(\d+)\s+([a-z]{3}),\s+(\d{4})')
+
+# El export se guarda en UTF-8 aunque el HTML no declare charset
+_HTML_PARSER = lhtml.HTMLParser(encoding='utf-8')
+
+def _xp_clase(clase):
+    """Predicado XPath que equivale a class_='clase' de BeautifulSoup."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {clase} ")'
+
+# XPaths precompilados para los bloques de pedido y sus campos
+_XP_PEDIDOS = XPath(f'//div[{_xp_clase("order-item")}]')
+_XP_CABECERA = XPath(f'.//div[{_xp_clase("order-item-header-right-info")}]')
+_XP_NOMBRE = XPath(f'(.//div[{_xp_clase("order-item-content-info-name")}])[1]//span')
+_XP_PRECIO = XPath(f'.//span[{_xp_clase("order-item-content-opt-price-total")}]')
+_XP_TEXTO = XPath('.//text()')
+
+def _texto(nodo, separador=''):
+    """Texto del nodo con cada fragmento sin espacios, como get_text(separador, strip=True)."""
+    return separador.join(t for t in (t.strip() for t in _XP_TEXTO(nodo)) if t)
+
 def limpiar_precio(texto_precio):
     """
     Convierte el texto sucio del precio (ej: "Total: US $ 15,92") a un número flotante.
@@ -21,7 +45,7 @@ def limpiar_precio(texto_precio):
     texto = texto_precio.replace('Total:', '').strip()
     
     # Eliminar símbolos de moneda comunes y espacios extra
-    texto = re.sub(r'[€$£USCHFzł\s]', '', texto)
+    texto = _RE_CURRENCY.sub('', texto)
     
     # Reemplazar la coma decimal por punto para que Python lo entienda
     # Nota: Asumimos formato europeo (8,99) -> 8.99
@@ -35,40 +59,38 @@ def limpiar_precio(texto_precio):
 def procesar_fecha(texto_fecha):
     """
     Convierte "Pedido efectuado el: 26 dic, 2025" a "26/12/2025"
-    y devuelve también el objeto fecha para ordenar o agrupar.
+    y devuelve también el Mes-Año ("12-2025") para agrupar.
     """
     # Extraer solo la parte de la fecha (ej: "26 dic, 2025")
-    match = re.search(r'(\d+)\s+([a-z]{3}),\s+(\d{4})', texto_fecha.lower())
+    match = _RE_DATE_ES.search(texto_fecha.lower())
     if match:
         dia, mes_txt, anio = match.groups()
-        mes_num = MESES.get(mes_txt, '01')
-        fecha_str = f"{dia}/{mes_num}/{anio}"
-        fecha_obj = datetime.strptime(fecha_str, "%d/%m/%Y")
-        return fecha_str, f"{mes_num}-{anio}" # Retornamos también Mes-Año para agrupar
+        if 1 <= int(dia) <= 31:
+            mes_num = MESES.get(mes_txt, '01')
+            return f"{dia}/{mes_num}/{anio}", f"{mes_num}-{anio}" # Retornamos también Mes-Año para agrupar
     return "Fecha desconocida", "Desconocido"
 
 def main():
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        # lxml lee el fichero en binario y decodifica en C, sin pasar por un str de Python
+        with open(INPUT_FILE, 'rb') as f:
+            root = lhtml.parse(f, parser=_HTML_PARSER).getroot()
     except FileNotFoundError:
         print(f"Error: No se encuentra el archivo '{INPUT_FILE}'.")
         return
 
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Encontrar todos los bloques de pedido
-    items = soup.find_all('div', class_='order-item')
+    # Encontrar todos los bloques de pedido (un fichero vacío no tiene raíz)
+    items = _XP_PEDIDOS(root) if root is not None else []
     
     datos_csv = []
-    totales_por_mes = {}
+    totales_por_mes = defaultdict(float)
     
     print(f"Procesando {len(items)} pedidos...")
 
     for item in items:
         # 1. Obtener Info de Cabecera (Fecha y Nº Pedido)
-        header_info = item.find('div', class_='order-item-header-right-info')
-        texto_header = header_info.get_text(" | ", strip=True) if header_info else ""
+        header_info = _XP_CABECERA(item)
+        texto_header = _texto(header_info[0], " | ") if header_info else ""
         
         # Buscar fecha y número de pedido dentro del texto
         # El texto suele ser: "Pedido efectuado el: 26 dic, 2025 | Nº de pedido: 3066..."
@@ -82,58 +104,48 @@ def main():
         ref_pedido = pedido_bruto.replace('Nº de pedido:', '').replace('Copiar', '').strip()
 
         # 2. Obtener Nombre del producto (Concepto)
-        nombre_div = item.find('div', class_='order-item-content-info-name')
-        if nombre_div and nombre_div.find('span'):
-            concepto = nombre_div.find('span').get_text(strip=True)[:16]
+        nombre_span = _XP_NOMBRE(item)
+        if nombre_span:
+            concepto = _texto(nombre_span[0])[:16]
         else:
             concepto = "Sin nombre"
 
         # 3. Obtener Precio
-        precio_div = item.find('span', class_='order-item-content-opt-price-total')
-        if precio_div:
-            # get_text une todos los spans internos (números y comas)
-            precio_texto = precio_div.get_text(strip=True)
-            importe = limpiar_precio(precio_texto)
+        precio_span = _XP_PRECIO(item)
+        if precio_span:
+            # el texto une todos los spans internos (números y comas)
+            importe = limpiar_precio(_texto(precio_span[0]))
         else:
             importe = 0.0
 
         # Acumular total mensual
-        if mes_anio not in totales_por_mes:
-            totales_por_mes[mes_anio] = 0.0
         totales_por_mes[mes_anio] += importe
 
-        # Guardar fila
-        datos_csv.append({
-            'Fecha': fecha_formateada,
-            'Proveedor': 'AliExpress Europa S.L.',
-            'Importe': f"{importe:.2f}",
-            'Concepto': concepto,
-            'Referencia': ref_pedido,
-            'Metodo': 'Tarjeta'
-        })
+        # Guardar fila (en el orden de FIELDNAMES)
+        datos_csv.append((
+            fecha_formateada,
+            'AliExpress Europa S.L.',
+            f"{importe:.2f}",
+            concepto,
+            ref_pedido,
+            'Tarjeta'
+        ))
 
     # Escribir CSV
     with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8-sig') as csvfile:
-        fieldnames = ['Fecha', 'Proveedor', 'Importe', 'Concepto', 'Referencia', 'Metodo']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=';')
+        writer = csv.writer(csvfile, delimiter=';')
 
-        writer.writeheader()
-        for fila in datos_csv:
-            writer.writerow(fila)
+        writer.writerow(FIELDNAMES)
+        writer.writerows(datos_csv)
         
         # Añadir filas de resumen al final
-        writer.writerow({}) # Fila vacía
-        writer.writerow({'Fecha': 'RESUMEN MENSUAL', 'Proveedor': '---', 'Importe': '---'})
+        writer.writerow([''] * len(FIELDNAMES)) # Fila vacía
+        writer.writerow(('RESUMEN MENSUAL', '---', '---', '', '', ''))
         
-        for mes, total in totales_por_mes.items():
-            writer.writerow({
-                'Fecha': f"Total {mes}",
-                'Proveedor': '',
-                'Importe': f"{total:.2f}",
-                'Concepto': 'Gasto total del mes',
-                'Referencia': '',
-                'Metodo': ''
-            })
+        writer.writerows(
+            (f"Total {mes}", '', f"{total:.2f}", 'Gasto total del mes', '', '')
+            for mes, total in totales_por_mes.items()
+        )
 
     print(f"¡Éxito! Se ha creado el archivo '{OUTPUT_FILE}' con {len(datos_csv)} registros.")
     print("Totales calculados:")
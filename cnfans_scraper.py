@@ -1,14 +1,29 @@
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from lxml import html as lhtml
+from lxml.etree import XPath
 from dotenv import load_dotenv
+import asyncio
 import os
 import csv
 import re
 from datetime import datetime, date
+from itertools import groupby
+from urllib.parse import urljoin
 
 # --- CONFIGURACIÓN ---
 LOGIN_URL = "https://cnfans.com/login"
 ORDERS_URL = "https://cnfans.com/my-account/orders"
+ORDER_ITEM_SELECTOR = "div.orders div.order-list div.order-item"
+
+# Nº del primer pedido de la lista y comprobación de que ha cambiado (para detectar el cambio de página)
+JS_FIRST_ORDER_NO = f"""() => {{
+    const el = document.querySelector("{ORDER_ITEM_SELECTOR} .order-no");
+    return el ? el.textContent : null;
+}}"""
+JS_ORDER_LIST_CHANGED = f"""(prev) => {{
+    const el = document.querySelector("{ORDER_ITEM_SELECTOR} .order-no");
+    return el !== null && el.textContent !== prev;
+}}"""
 
 # RANGO DE FECHAS (inclusive)
 START_DATE_STR = "09-12-2025"  # dd-mm-YYYY
@@ -19,6 +34,17 @@ END_DATE = datetime.strptime(END_DATE_STR, "%d-%m-%Y").date()
 # Salida
 OUTPUT_CSV = "cnfans_pedidos_gastos.csv"
 CSV_DELIMITER = ";"  # recomendado para Excel en España
+CSV_FIELDNAMES = (
+    "Fecha del gasto",
+    "Proveedor",
+    "Importe pagado",
+    "Concepto",
+    "Nº de pedido",
+    "Método de pago",
+)
+
+# Pestañas dedicadas a los parcels (se descargan a la vez y comparten la sesión del navegador)
+PARCEL_CONCURRENCY = 6
 
 # Constantes contables
 SUPPLIER_NAME = "Cnfans"
@@ -33,12 +59,22 @@ if not CNFANS_EMAIL or not CNFANS_PASSWORD:
         "Faltan credenciales. Asegúrate de tener CNFANS_EMAIL y CNFANS_PASSWORD en tu archivo .env o variables de entorno."
     )
 
+# Patrones precompilados (se usan una vez por pedido)
+_RE_MONEY = re.compile(r"[-]?\d[\d.,]*")
+_RE_WS = re.compile(r"\s+")
+# keywords de sudadera/hoodie (una sola pasada por nombre, sin distinguir mayúsculas)
+_RE_HOODIE = re.compile(r"hoodie|sudadera|sweatshirt|pullover|hood", re.IGNORECASE)
+# intercambia separadores de miles y decimales (formato US -> formato España)
+_MONEY_ES_TRANS = str.maketrans({",": ".", ".": ","})
+# fecha con separador "-" o "/" (el mismo en ambas posiciones) y hora opcional
+_RE_CREATE_TIME = re.compile(r"(\d{1,4})([-/])(\d{1,2})\2(\d{1,4})(?: (\d{1,2}):(\d{1,2})(?::(\d{1,2}))?)?")
+
 
 # ----------------- HELPERS -----------------
 def parse_create_time_to_date(create_time_raw: str):
     """
     Convierte el texto 'create_time' a date.
-    Intenta varios formatos típicos.
+    Acepta d-m-Y, Y-m-d, d/m/Y y m/d/Y, con hora opcional (H:M o H:M:S).
     Si no puede, devuelve None.
     """
     if not create_time_raw:
@@ -49,27 +85,29 @@ def parse_create_time_to_date(create_time_raw: str):
 
     # Si viene con texto extra, nos quedamos con el trozo más "fecha/hora"
     # (no hace milagros, pero ayuda con casos raros)
-    s = re.sub(r"\s+", " ", s)
-
-    fmts = [
-        "%d-%m-%Y",
-        "%d-%m-%Y %H:%M",
-        "%d-%m-%Y %H:%M:%S",
-        "%Y-%m-%d",
-        "%Y-%m-%d %H:%M",
-        "%Y-%m-%d %H:%M:%S",
-        "%d/%m/%Y",
-        "%d/%m/%Y %H:%M",
-        "%d/%m/%Y %H:%M:%S",
-        # por si la web usa formato americano (ojo: ambiguo en fechas tipo 12/09/2025)
-        "%m/%d/%Y",
-        "%m/%d/%Y %H:%M",
-        "%m/%d/%Y %H:%M:%S",
-    ]
-
-    for fmt in fmts:
+    s = _RE_WS.sub(" ", s)
+
+    m = _RE_CREATE_TIME.fullmatch(s)
+    if not m:
+        return None
+
+    a, sep, b, c, hh, mi, ss = m.groups()
+    if hh is not None and (int(hh) > 23 or int(mi) > 59 or (ss is not None and int(ss) > 59)):
+        return None
+
+    if len(a) == 4 and len(c) <= 2:
+        # Y-m-d (con "/" no se aceptaba)
+        candidates = [(a, b, c)] if sep == "-" else []
+    elif len(a) <= 2 and len(c) == 4:
+        # d-m-Y / d/m/Y; con "/" probamos también el formato americano
+        # (ojo: ambiguo en fechas tipo 12/09/2025, gana d/m/Y)
+        candidates = [(c, b, a), (c, a, b)] if sep == "/" else [(c, b, a)]
+    else:
+        candidates = []
+
+    for y, mo, d in candidates:
         try:
-            return datetime.strptime(s, fmt).date()
+            return date(int(y), int(mo), int(d))
         except ValueError:
             continue
 
@@ -84,7 +122,7 @@ def parse_money(value: str) -> float:
     if not value:
         return 0.0
 
-    m = re.search(r"[-]?\d[\d.,]*", value)
+    m = _RE_MONEY.search(value)
     if not m:
         return 0.0
 
@@ -126,8 +164,7 @@ def format_money_es(amount: float) -> str:
     """
     Formato España: 1.234,56 €
     """
-    s = f"{amount:,.2f}"           # 1,234.56
-    s = s.replace(",", "X").replace(".", ",").replace("X", ".")  # 1.234,56
+    s = f"{amount:,.2f}".translate(_MONEY_ES_TRANS)  # 1,234.56 -> 1.234,56
     return f"{s} €"
 
 
@@ -139,11 +176,10 @@ def pick_hoodie_name(products) -> str:
     if not products:
         return "sin producto"
 
-    keywords = ("hoodie", "sudadera", "sweatshirt", "pullover", "hood")
     # 1) buscar por keywords
     for p in products:
         name = (p.get("name") or "").strip()
-        if name and any(k in name.lower() for k in keywords):
+        if name and _RE_HOODIE.search(name):
             return name
 
     # 2) fallback: primero con nombre
@@ -156,77 +192,100 @@ def pick_hoodie_name(products) -> str:
 
 
 # ----------------- PARSEO HTML -----------------
-def extract_order_basic_info(order_html: str):
-    """Parsea el HTML de un bloque .order-item individual para info básica."""
-    soup = BeautifulSoup(order_html, "lxml")
-
-    header = soup.select_one(".order-date-no")
-    create_time = ""
-    order_no = ""
-
-    if header:
-        date_span = header.select_one(".order-date")
-        order_no_span = header.select_one(".order-no")
-        if date_span:
-            create_time = date_span.get_text(strip=True).replace("Create Time:", "").strip()
-        if order_no_span:
-            order_no = order_no_span.get_text(strip=True).replace("Order No:", "").strip()
-
-    status_span = soup.select_one(".status-manage-wrapper .status-node-status")
-    status = status_span.get_text(strip=True) if status_span else ""
-
-    total_product_amount = ""
-    domestic_shipping = ""
-    value_added_services = ""
-    payment_method = ""
-
-    # extras (si existieran en la web)
-    total_amount = ""
-    actual_payment = ""
-
-    for price_meta in soup.select(".order-price-info .price-meta"):
-        label_el = price_meta.select_one(".meta-label")
-        value_el = price_meta.select_one(".meta-value")
-        if not label_el or not value_el:
+def _xp_class(cls: str) -> str:
+    """Predicado XPath equivalente al selector CSS '.cls' (coincidencia exacta de clase)."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {cls} ")'
+
+
+# XPaths precompilados una sola vez (equivalentes a los selectores CSS de la web)
+XP_ORDER_ITEMS = XPath(f'//div[{_xp_class("orders")}]//div[{_xp_class("order-list")}]//div[{_xp_class("order-item")}]')
+XP_ORDER_DATE = XPath(f'.//*[{_xp_class("order-date-no")}]//*[{_xp_class("order-date")}]')
+XP_ORDER_NO = XPath(f'.//*[{_xp_class("order-date-no")}]//*[{_xp_class("order-no")}]')
+XP_STATUS = XPath(f'.//*[{_xp_class("status-manage-wrapper")}]//*[{_xp_class("status-node-status")}]')
+XP_PRICE_METAS = XPath(f'.//*[{_xp_class("order-price-info")}]//*[{_xp_class("price-meta")}]')
+XP_META_LABEL = XPath(f'.//*[{_xp_class("meta-label")}]')
+XP_META_VALUE = XPath(f'.//*[{_xp_class("meta-value")}]')
+XP_PRODUCT_BLOCKS = XPath(
+    f'.//*[{_xp_class("order-product-info")}]'
+    f'//*[{_xp_class("order-product-info-meta")} and {_xp_class("product-detail")}]'
+)
+XP_PRODUCT_IMG_SRC = XPath(f'.//*[{_xp_class("product-main-img")}]//img/@src')
+XP_PRODUCT_NAME = XPath(f'.//*[{_xp_class("product-name")}]//span')
+XP_PRODUCT_SKU = XPath(f'.//*[{_xp_class("product-sku")}]//span')
+XP_PRODUCT_PRICE_SPANS = XPath(f'(.//*[{_xp_class("product-price")}])[1]//span')
+XP_DETAILS_HREF = XPath('.//a[contains(@href, "/my-account/order-detail")]/@href')
+XP_PARCEL_HREF = XPath('.//a[contains(@href, "parcel-detail")]/@href')
+XP_LOGISTICS_PRICE = XPath(f'.//*[{_xp_class("logistics-price-total")}]//*[{_xp_class("price-value")}]')
+XP_DECLARE_TOTAL = XPath(f'.//*[{_xp_class("table-row-item")}]//*[{_xp_class("declare-total")}]')
+XP_TEXT = XPath(".//text()")
+
+
+def _text(el) -> str:
+    """Texto de un nodo con cada fragmento sin espacios (como get_text(strip=True))."""
+    return "".join(t.strip() for t in XP_TEXT(el))
+
+
+def _first_text(xpath, el) -> str:
+    """Texto del primer nodo que devuelve el XPath, o "" si no hay."""
+    nodes = xpath(el)
+    return _text(nodes[0]) if nodes else ""
+
+
+# Etiqueta de .price-meta -> campo del pedido.
+# El orden importa para el fallback por substring ("Total Product Amount" antes que "Total Amount").
+_LABEL_MAP = {
+    "Total Product Amount": "total_product_amount",
+    "Domestic Shipping": "domestic_shipping",
+    "Value-added Services": "value_added_services",
+    "Payment Method": "payment_method",
+    "Actual Payment": "actual_payment",
+    "Paid Amount": "actual_payment",
+    "Total Amount": "total_amount",
+}
+
+
+def _label_to_field(label: str):
+    """Campo del pedido para una etiqueta de precio, o None si no nos interesa."""
+    field = _LABEL_MAP.get(label.rstrip(":").strip())
+    if field is not None:
+        return field
+
+    # Etiquetas con texto extra: buscamos por substring
+    for key, field in _LABEL_MAP.items():
+        if key in label:
+            return field
+    return None
+
+
+def extract_order_basic_info(order_el):
+    """Extrae la info básica de un elemento lxml .order-item individual."""
+    create_time = _first_text(XP_ORDER_DATE, order_el).replace("Create Time:", "").strip()
+    order_no = _first_text(XP_ORDER_NO, order_el).replace("Order No:", "").strip()
+    status = _first_text(XP_STATUS, order_el)
+
+    # extras (total_amount / actual_payment) solo si existieran en la web
+    price_fields = dict.fromkeys(_LABEL_MAP.values(), "")
+    for price_meta in XP_PRICE_METAS(order_el):
+        label_els = XP_META_LABEL(price_meta)
+        value_els = XP_META_VALUE(price_meta)
+        if not label_els or not value_els:
             continue
 
-        label = label_el.get_text(strip=True)
-        value = value_el.get_text(strip=True)
-
-        if "Total Product Amount" in label:
-            total_product_amount = value
-        elif "Domestic Shipping" in label:
-            domestic_shipping = value
-        elif "Value-added Services" in label:
-            value_added_services = value
-        elif "Payment Method" in label:
-            payment_method = value
-        elif ("Actual Payment" in label) or ("Paid Amount" in label):
-            actual_payment = value
-        elif ("Total Amount" in label) and ("Total Product Amount" not in label):
-            total_amount = value
+        field = _label_to_field(_text(label_els[0]))
+        if field:
+            price_fields[field] = _text(value_els[0])
 
     products = []
-    product_blocks = soup.select(".order-product-info .order-product-info-meta.product-detail")
-    for pb in product_blocks:
-        img_el = pb.select_one(".product-main-img img")
-        image_url = img_el["src"] if img_el and img_el.has_attr("src") else ""
-
-        name_span = pb.select_one(".product-name span")
-        name = name_span.get_text(strip=True) if name_span else ""
-
-        sku_span = pb.select_one(".product-sku span")
-        sku = sku_span.get_text(strip=True) if sku_span else ""
-
-        price_container = pb.select_one(".product-price")
-        price = ""
-        quantity = ""
-        if price_container:
-            spans = price_container.select("span")
-            if len(spans) >= 1:
-                price = spans[0].get_text(strip=True)
-            if len(spans) >= 2:
-                quantity = spans[1].get_text(strip=True)
+    for pb in XP_PRODUCT_BLOCKS(order_el):
+        img_srcs = XP_PRODUCT_IMG_SRC(pb)
+        image_url = img_srcs[0] if img_srcs else ""
+
+        name = _first_text(XP_PRODUCT_NAME, pb)
+        sku = _first_text(XP_PRODUCT_SKU, pb)
+
+        spans = XP_PRODUCT_PRICE_SPANS(pb)
+        price = _text(spans[0]) if len(spans) >= 1 else ""
+        quantity = _text(spans[1]) if len(spans) >= 2 else ""
 
         products.append(
             {
@@ -238,30 +297,40 @@ def extract_order_basic_info(order_html: str):
             }
         )
 
-    details_link_el = soup.select_one('a[href*="/my-account/order-detail"]')
-    details_url = details_link_el["href"] if details_link_el else ""
+    details_hrefs = XP_DETAILS_HREF(order_el)
+    details_url = details_hrefs[0] if details_hrefs else ""
+
+    # Si el pedido enlaza al parcel podemos abrirlo directamente, sin pulsar "View Parcel"
+    parcel_hrefs = XP_PARCEL_HREF(order_el)
+    parcel_url = urljoin(ORDERS_URL, parcel_hrefs[0]) if parcel_hrefs else ""
 
     return {
         "order_no": order_no,
         "create_time": create_time,
         "status": status,
-        "total_product_amount": total_product_amount,
-        "domestic_shipping": domestic_shipping,
-        "value_added_services": value_added_services,
-        "payment_method": payment_method,
-        "total_amount": total_amount,
-        "actual_payment": actual_payment,
+        "total_product_amount": price_fields["total_product_amount"],
+        "total_product_amount_f": parse_money(price_fields["total_product_amount"]),
+        "domestic_shipping": price_fields["domestic_shipping"],
+        "domestic_shipping_f": parse_money(price_fields["domestic_shipping"]),
+        "value_added_services": price_fields["value_added_services"],
+        "value_added_services_f": parse_money(price_fields["value_added_services"]),
+        "payment_method": price_fields["payment_method"],
+        "total_amount": price_fields["total_amount"],
+        "total_amount_f": parse_money(price_fields["total_amount"]),
+        "actual_payment": price_fields["actual_payment"],
+        "actual_payment_f": parse_money(price_fields["actual_payment"]),
         "details_url": details_url,
+        "parcel_url": parcel_url,
         "products": products,
     }
 
 
-def get_parcel_details(target_page):
+async def get_parcel_details(target_page):
     """
     Extrae shipping_cost (precio total logística) y declare_total si aparece.
     """
     try:
-        target_page.wait_for_load_state("networkidle", timeout=20000)
+        await target_page.wait_for_load_state("networkidle", timeout=20000)
     except:
         pass
 
@@ -270,40 +339,101 @@ def get_parcel_details(target_page):
 
     try:
         price_locator = target_page.locator(".logistics-price-total .price-value").first
-        price_locator.wait_for(state="attached", timeout=10000)
-        if price_locator.count() > 0:
-            shipping_cost = price_locator.inner_text().strip()
+        await price_locator.wait_for(state="attached", timeout=10000)
+        if await price_locator.count() > 0:
+            shipping_cost = (await price_locator.inner_text()).strip()
 
         declare_locator = target_page.locator(".table-row-item .declare-total").first
-        if declare_locator.count() > 0:
-            declare_total = declare_locator.inner_text().strip()
+        if await declare_locator.count() > 0:
+            declare_total = (await declare_locator.inner_text()).strip()
 
     except Exception as e:
         print(f" [Debug: Falló selector en {target_page.url}: {e}] ", end="")
-        target_page.screenshot(path="debug_error_parcel.png")
+        await target_page.screenshot(path="debug_error_parcel.png")
+
+    return shipping_cost, declare_total
+
+
+def set_parcel_details(order_data: dict, shipping_cost: str, declare_total: str):
+    """Guarda los datos del parcel en el pedido (con el envío ya parseado, como el resto de importes)."""
+    order_data["shipping_cost"] = shipping_cost
+    order_data["shipping_cost_f"] = parse_money(shipping_cost)
+    order_data["declare_total"] = declare_total
+
 
+async def get_parcel_details_http(request, parcel_url: str):
+    """
+    Descarga el parcel_url con una petición HTTP (misma sesión que el navegador, sin renderizar)
+    y saca shipping_cost / declare_total del HTML.
+    Devuelve None si el HTML no trae el precio de logística (página renderizada en cliente).
+    """
+    response = await request.get(parcel_url)
+    if not response.ok:
+        return None
+
+    root = lhtml.fromstring(await response.text())
+    price_nodes = XP_LOGISTICS_PRICE(root)
+    if not price_nodes:
+        return None
+
+    declare_nodes = XP_DECLARE_TOTAL(root)
+    shipping_cost = _text(price_nodes[0])
+    declare_total = _text(declare_nodes[0]) if declare_nodes else ""
     return shipping_cost, declare_total
 
 
+async def fetch_parcel_details(request, detail_pages: asyncio.Queue, order_data: dict):
+    """
+    Rellena shipping_cost / declare_total del pedido a partir de su parcel_url.
+    Primero prueba con HTTP directo; si la página necesita JS, navega una pestaña libre del pool.
+    Cada descarga ocupa una pestaña del pool, así su tamaño limita cuántas van a la vez.
+    """
+    parcel_page = await detail_pages.get()
+    try:
+        try:
+            details = await get_parcel_details_http(request, order_data["parcel_url"])
+        except Exception:
+            details = None
+
+        if details is None:
+            await parcel_page.goto(order_data["parcel_url"], wait_until="domcontentloaded")
+            details = await get_parcel_details(parcel_page)
+
+        shipping_cost, declare_total = details
+        print(f"      Pedido {order_data['order_no']}: [Parcel OK: Envío={shipping_cost}]")
+    except Exception as e:
+        shipping_cost, declare_total = "", ""
+        print(f"      Pedido {order_data['order_no']}: [No cargó parcel info: {e}]")
+    finally:
+        detail_pages.put_nowait(parcel_page)
+
+    set_parcel_details(order_data, shipping_cost, declare_total)
+
+
 # ----------------- SCRAPING POR PÁGINA -----------------
-def process_page_orders(page):
+async def process_page_orders(page, detail_pages: asyncio.Queue):
     """
     Recorre pedidos de la página actual.
     - Filtra por rango de fecha.
     - Si detecta un pedido anterior al START_DATE, activa stop_early (asumiendo orden descendente).
+    - Los parcels con enlace directo se descargan en paralelo al final de la página.
     Devuelve: (orders_in_range, stop_early)
     """
     processed_orders = []
+    parcel_tasks = []
     stop_early = False
 
-    page.wait_for_selector("div.orders div.order-list div.order-item", timeout=15000)
-    items_count = page.locator("div.orders div.order-list div.order-item").count()
+    await page.wait_for_selector(ORDER_ITEM_SELECTOR, timeout=15000)
+    # Un solo viaje al navegador y un solo parseo para todos los pedidos de la página
+    page_root = lhtml.fromstring(await page.content())
+    order_elements = XP_ORDER_ITEMS(page_root)
+    items_count = len(order_elements)
     print(f"   -> Encontrados {items_count} pedidos en esta página.")
 
-    for i in range(items_count):
-        order_locator = page.locator("div.orders div.order-list div.order-item").nth(i)
-        order_html = order_locator.inner_html()
-        order_data = extract_order_basic_info(order_html)
+    # Handles de los pedidos: solo se piden si algún pedido necesita pulsar "View Parcel"
+    order_handles = None
+    for i, order_element in enumerate(order_elements):
+        order_data = extract_order_basic_info(order_element)
 
         order_date = parse_create_time_to_date(order_data.get("create_time", ""))
         if order_date is None:
@@ -323,56 +453,72 @@ def process_page_orders(page):
 
         print(f"      [{i+1}/{items_count}] Pedido: {order_data['order_no']} ({order_date})...", end="", flush=True)
 
+        set_parcel_details(order_data, "", "")
+        processed_orders.append(order_data)
+
         # Solo si entra en rango, intentamos sacar shipping_cost (View Parcel)
-        view_parcel_btn = order_locator.locator("button", has_text="View Parcel")
+        if order_data["parcel_url"]:
+            parcel_tasks.append(fetch_parcel_details(page.context.request, detail_pages, order_data))
+            print(" [Parcel en cola] Done.")
+            continue
+
+        # Sin enlace directo: hay que pulsar el botón en esta misma página
+        if order_handles is None:
+            order_handles = await page.query_selector_all(ORDER_ITEM_SELECTOR)
+        view_parcel_btn = None
+        if i < len(order_handles):
+            view_parcel_btn = await order_handles[i].query_selector("button:has-text('View Parcel')")
         shipping_cost = ""
         declare_total = ""
 
-        if view_parcel_btn.count() > 0:
+        if view_parcel_btn is not None:
             try:
                 # Importante: timeout bajo para no perder 30s si NO abre popup
-                with page.context.expect_page(timeout=1500) as new_page_info:
-                    view_parcel_btn.first.click()
+                async with page.context.expect_page(timeout=1500) as new_page_info:
+                    await view_parcel_btn.click()
 
                 # Caso A: popup
-                new_page = new_page_info.value
-                new_page.wait_for_load_state()
-                shipping_cost, declare_total = get_parcel_details(new_page)
-                new_page.close()
+                new_page = await new_page_info.value
+                await new_page.wait_for_load_state()
+                shipping_cost, declare_total = await get_parcel_details(new_page)
+                await new_page.close()
                 print(f" [Popup OK: Envío={shipping_cost}]", end="")
 
             except:
-                # Caso B: misma pestaña
+                # Caso B: misma pestaña (al volver atrás los handles ya no sirven)
+                order_handles = None
                 try:
-                    page.wait_for_url("*parcel-detail*", timeout=10000)
-                    shipping_cost, declare_total = get_parcel_details(page)
+                    await page.wait_for_url("*parcel-detail*", timeout=10000)
+                    shipping_cost, declare_total = await get_parcel_details(page)
                     print(f" [Nav OK: Envío={shipping_cost}]", end="")
 
-                    page.go_back()
-                    page.wait_for_selector("div.orders div.order-list div.order-item", timeout=15000)
+                    await page.go_back()
+                    await page.wait_for_selector(ORDER_ITEM_SELECTOR, timeout=15000)
                 except Exception as e:
                     print(f" [No cargó parcel info: {e}]", end="")
                     if "orders" not in page.url:
-                        page.go_back()
-                        page.wait_for_selector("div.orders div.order-list div.order-item", timeout=15000)
+                        await page.go_back()
+                        await page.wait_for_selector(ORDER_ITEM_SELECTOR, timeout=15000)
         else:
             print(" [Sin botón Parcel]", end="")
 
         print(" Done.")
 
-        order_data["shipping_cost"] = shipping_cost
-        order_data["declare_total"] = declare_total
-        processed_orders.append(order_data)
+        set_parcel_details(order_data, shipping_cost, declare_total)
+
+    if parcel_tasks:
+        print(f"   -> Descargando {len(parcel_tasks)} parcels ({PARCEL_CONCURRENCY} a la vez)...")
+        await asyncio.gather(*parcel_tasks)
 
     return processed_orders, stop_early
 
 
-def go_to_next_page(page) -> bool:
+async def go_to_next_page(page) -> bool:
     active = page.locator(".n-pagination-item.n-pagination-item--active")
-    if active.count() == 0:
+    if await active.count() == 0:
         return False
 
-    current_page_text = active.first.inner_text().strip()
+    current_page_text = (await active.first.inner_text()).strip()
     try:
         current_page = int(current_page_text)
     except ValueError:
@@ -383,16 +529,28 @@ def go_to_next_page(page) -> bool:
         ".n-pagination-item.n-pagination-item--clickable", has_text=next_page_str
     )
 
-    if next_page_item.count() == 0:
+    if await next_page_item.count() == 0:
         return False
 
     print(f"--- Navegando a página {next_page_str} ---")
-    next_page_item.first.click()
-    page.wait_for_timeout(3000)
+    first_order_no = await page.evaluate(JS_FIRST_ORDER_NO)
+    await next_page_item.first.click()
+
+    # En vez de dormir un tiempo fijo, esperamos a que la lista muestre otros pedidos
+    try:
+        await page.wait_for_function(JS_ORDER_LIST_CHANGED, arg=first_order_no, timeout=15000)
+    except PlaywrightTimeoutError:
+        print("   [Aviso: la lista de pedidos no cambió tras 15s]")
     return True
 
 
 # ----------------- TRANSFORMACIÓN A CSV CONTABLE -----------------
+def _money(order: dict, field: str) -> float:
+    """Importe ya parseado en la extracción (campo_f); si no está, se parsea el texto."""
+    amount = order.get(f"{field}_f")
+    return amount if amount is not None else parse_money(order.get(field, ""))
+
+
 def compute_paid_amount(order: dict) -> float:
     """
     Importe pagado:
@@ -401,15 +559,15 @@ def compute_paid_amount(order: dict) -> float:
     - else sumar total_product_amount + domestic_shipping + value_added_services + shipping_cost
     """
     if order.get("actual_payment"):
-        return parse_money(order["actual_payment"])
+        return _money(order, "actual_payment")
     if order.get("total_amount"):
-        return parse_money(order["total_amount"])
+        return _money(order, "total_amount")
 
     return (
-        parse_money(order.get("total_product_amount", ""))
-        + parse_money(order.get("domestic_shipping", ""))
-        + parse_money(order.get("value_added_services", ""))
-        + parse_money(order.get("shipping_cost", ""))
+        _money(order, "total_product_amount")
+        + _money(order, "domestic_shipping")
+        + _money(order, "value_added_services")
+        + _money(order, "shipping_cost")
     )
 
 
@@ -449,42 +607,16 @@ def build_expense_rows(orders: list[dict]) -> list[dict]:
     # Ordenar por fecha ascendente
     rows.sort(key=lambda r: r["Fecha del gasto"])
 
-    # Insertar total mensual al final de cada mes
+    # Insertar total mensual al final de cada mes (las filas ya vienen agrupadas por mes al estar ordenadas)
     final_rows = []
-    current_month = None
-    month_sum = 0.0
-
-    for r in rows:
-        ym = (r["Fecha del gasto"].year, r["Fecha del gasto"].month)
-        if current_month is None:
-            current_month = ym
-
-        if ym != current_month:
-            y, m = current_month
-            final_rows.append(
-                {
-                    "Fecha del gasto": "",
-                    "Proveedor": "",
-                    "Importe pagado": month_sum,
-                    "Concepto": f"TOTAL MES {y}-{m:02d}",
-                    "Nº de pedido": "",
-                    "Método de pago": "",
-                }
-            )
-            month_sum = 0.0
-            current_month = ym
-
-        month_sum += float(r["Importe pagado"])
-        final_rows.append(r)
-
-    # último mes
-    if current_month is not None:
-        y, m = current_month
+    for (y, m), month_rows in groupby(rows, key=lambda r: (r["Fecha del gasto"].year, r["Fecha del gasto"].month)):
+        month_rows = list(month_rows)
+        final_rows.extend(month_rows)
         final_rows.append(
             {
                 "Fecha del gasto": "",
                 "Proveedor": "",
-                "Importe pagado": month_sum,
+                "Importe pagado": sum(float(r["Importe pagado"]) for r in month_rows),
                 "Concepto": f"TOTAL MES {y}-{m:02d}",
                 "Nº de pedido": "",
                 "Método de pago": "",
@@ -494,61 +626,54 @@ def build_expense_rows(orders: list[dict]) -> list[dict]:
     return final_rows
 
 
-def save_expenses_to_csv(expense_rows: list[dict], filename: str = OUTPUT_CSV):
-    fieldnames = [
-        "Fecha del gasto",
-        "Proveedor",
-        "Importe pagado",
-        "Concepto",
-        "Nº de pedido",
-        "Método de pago",
-    ]
-
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=CSV_DELIMITER)
-        writer.writeheader()
-
-        for r in expense_rows:
-            fecha = r["Fecha del gasto"]
-            fecha_str = fecha.strftime("%d-%m-%Y") if isinstance(fecha, date) else ""
+def format_expense_row(r: dict) -> tuple:
+    """Fila lista para el CSV (en el orden de CSV_FIELDNAMES): fecha dd-mm-YYYY e importe con 2 decimales."""
+    fecha = r["Fecha del gasto"]
+    importe = r["Importe pagado"]
+    return (
+        fecha.strftime("%d-%m-%Y") if isinstance(fecha, date) else "",
+        r["Proveedor"],
+        f"{float(importe):.2f}" if importe != "" else "",
+        r["Concepto"],
+        r["Nº de pedido"],
+        r["Método de pago"],
+    )
 
-            importe = r["Importe pagado"]
-            importe_str = f"{float(importe):.2f}" if importe != "" else ""
 
-            writer.writerow(
-                {
-                    "Fecha del gasto": fecha_str,
-                    "Proveedor": r["Proveedor"],
-                    "Importe pagado": importe_str,
-                    "Concepto": r["Concepto"],
-                    "Nº de pedido": r["Nº de pedido"],
-                    "Método de pago": r["Método de pago"],
-                }
-            )
+def save_expenses_to_csv(expense_rows: list[dict], filename: str = OUTPUT_CSV):
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=CSV_DELIMITER)
+        writer.writerow(CSV_FIELDNAMES)
+        writer.writerows(map(format_expense_row, expense_rows))
 
 
 # ----------------- SCRAPER PRINCIPAL -----------------
-def scrape_cnfans_orders():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        context = browser.new_context()
-        page = context.new_page()
+async def scrape_cnfans_orders():
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=False)
+        context = await browser.new_context()
+        page = await context.new_page()
 
         print("Iniciando sesión...")
-        page.goto(LOGIN_URL, wait_until="networkidle")
-        page.fill('input[placeholder="Username or email address"]', CNFANS_EMAIL)
-        page.fill('input[placeholder="Enter password"]', CNFANS_PASSWORD)
-        page.click('button:has-text("login")')
-        page.wait_for_timeout(4000)
+        await page.goto(LOGIN_URL, wait_until="networkidle")
+        await page.fill('input[placeholder="Username or email address"]', CNFANS_EMAIL)
+        await page.fill('input[placeholder="Enter password"]', CNFANS_PASSWORD)
+        await page.click('button:has-text("login")')
+        await page.wait_for_timeout(4000)
 
         print("Yendo a lista de pedidos...")
-        page.goto(ORDERS_URL, wait_until="networkidle")
+        await page.goto(ORDERS_URL, wait_until="networkidle")
 
         all_orders = []
         seen_order_nos = set()
 
+        # Pool de pestañas para los parcels: se abren una vez y se reutilizan en todas las páginas
+        detail_pages = asyncio.Queue()
+        for _ in range(PARCEL_CONCURRENCY):
+            detail_pages.put_nowait(await context.new_page())
+
         while True:
-            orders_on_page, stop_early = process_page_orders(page)
+            orders_on_page, stop_early = await process_page_orders(page, detail_pages)
 
             for o in orders_on_page:
                 order_no = o.get("order_no")
@@ -562,10 +687,10 @@ def scrape_cnfans_orders():
             if stop_early:
                 break
 
-            if not go_to_next_page(page):
+            if not await go_to_next_page(page):
                 break
 
-        browser.close()
+        await browser.close()
         return all_orders
 
 
@@ -573,7 +698,7 @@ if __name__ == "__main__":
     print("Iniciando Scraper CNFans...")
     print(f"Rango: {START_DATE.strftime('%d-%m-%Y')} -> {END_DATE.strftime('%d-%m-%Y')}")
 
-    orders = scrape_cnfans_orders()
+    orders = asyncio.run(scrape_cnfans_orders())
     print(f"\nPedidos en rango (únicos): {len(orders)}")
 
     expense_rows = build_expense_rows(orders)
@@ -1,25 +1,394 @@
+import codecs
+import contextlib
 import csv
+import hashlib
+import io
+import math
+import mmap
+import re
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+from reportlab.platypus import Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from itertools import accumulate, chain, pairwise
+from functools import lru_cache
+from operator import itemgetter
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
 import os
 
 
+# Colores de las tablas (se crean una sola vez)
+COLOR_ENCABEZADO = colors.HexColor('#4472C4')
+COLOR_ALTERNO = colors.HexColor('#F2F2F2')
+COLOR_TOTAL = colors.HexColor('#FFE699')
+
+# Fecha 'dd/mm/aaaa' o 'dd-mm-aaaa' (el mismo separador en ambos sitios)
+_RE_FECHA = re.compile(r'(\d{1,2})([/-])(\d{1,2})\2(\d{4})', re.ASCII)
+
+# Alto de fila de las tablas (interlineado 12 + padding 3 arriba y abajo) y hueco sobre la tabla
+PADDING_CELDA = 3
+LEADING_CELDA = 12
+ALTO_FILA = LEADING_CELDA + 2 * PADDING_CELDA
+PADDING_MARCO = 6
+
+# Páginas y márgenes (10 mm por lado)
+MARGEN = 10*mm
+PAGINA_HORIZONTAL = landscape(A4)
+PAGINA_VERTICAL = A4
+ANCHO_UTIL_HORIZONTAL = PAGINA_HORIZONTAL[0] - 2*MARGEN
+ANCHO_UTIL_VERTICAL = PAGINA_VERTICAL[0] - 2*MARGEN
+_ANCHO_UTIL = {PAGINA_HORIZONTAL: ANCHO_UTIL_HORIZONTAL, PAGINA_VERTICAL: ANCHO_UTIL_VERTICAL}
+
+def _filas_por_pagina(pagesize):
+    """
+    Filas de datos (sin contar el encabezado) que caben en una página.
+    """
+    return max(1, int((pagesize[1] - 2 * MARGEN - 2 * PADDING_MARCO) // ALTO_FILA) - 1)
+
+
+# (máximo de columnas, tamaño de fuente); con más columnas se usa TAMAÑO_FUENTE_MINIMO
+_TAMAÑOS_FUENTE = ((4, 10), (6, 8))
+TAMAÑO_FUENTE_MINIMO = 7
+
+
 def calcular_tamaño_fuente(num_columnas, num_filas, ancho_disponible):
     """
     Calcula el tamaño de fuente óptimo basándose en el número de columnas.
     """
-    if num_columnas <= 4:
-        return 10
-    elif num_columnas <= 6:
-        return 8
-    else:
-        return 7
+    for max_columnas, tamaño in _TAMAÑOS_FUENTE:
+        if num_columnas <= max_columnas:
+            return tamaño
+    return TAMAÑO_FUENTE_MINIMO
+
+
+@lru_cache(maxsize=8192)
+def _parse_fecha(fecha_str):
+    """
+    Convierte una fecha 'dd/mm/aaaa' o 'dd-mm-aaaa' en su ordinal (0 si no es válida), que ordena
+    igual que la fecha. Se cachea porque en los gastos se repiten muchas fechas del mismo día.
+    """
+    m = _RE_FECHA.fullmatch(fecha_str)
+    if m:
+        try:
+            return date(int(m[4]), int(m[3]), int(m[1])).toordinal()
+        except ValueError:
+            pass
+    return 0
+
+
+def _clave_fecha(fila):
+    """Clave de ordenación por la fecha de la primera columna."""
+    return _parse_fecha(fila[0]) if fila else 0
+
+
+def _ordenar_por_fecha(filas_datos):
+    """
+    Ordena las filas por fecha descendente, en el sitio. Los exportadores ya escriben los gastos
+    de más reciente a más antiguo, así que primero se comprueba en una pasada si hace falta.
+    """
+    # Cada fecha se convierte una sola vez y la misma lista sirve para comprobar y para ordenar
+    claves = list(map(_clave_fecha, filas_datos))
+    if all(a >= b for a, b in pairwise(claves)):
+        return
+    pares = list(zip(claves, filas_datos))
+    pares.sort(key=itemgetter(0), reverse=True)
+    filas_datos[:] = [fila for _, fila in pares]
+
+
+def _extraer_importe(fila):
+    """
+    Importe de una fila de gasto (columna 2); 0.0 si falta o no es numérico.
+    """
+    try:
+        return float(fila[2].replace(',', '.').strip())
+    except (IndexError, ValueError):
+        return 0.0
+
+
+def _cortes_por_importe(importes, num_partes, importe_total):
+    """
+    Índices en los que empieza cada parte nueva al repartir los importes (en su orden)
+    en num_partes bloques de importe parecido. importe_total es la suma de importes ya calculada.
+    """
+    importe_por_parte = importe_total / num_partes
+    cortes = []
+    inicio_parte = 0
+    importe_acumulado = 0.0
+    
+    for i, importe in enumerate(importes):
+        # Si añadir esta fila supera el límite y ya tenemos algo en la parte actual
+        if importe_acumulado + importe > importe_por_parte and i > inicio_parte and len(cortes) < num_partes - 1:
+            cortes.append(i)
+            inicio_parte = i
+            importe_acumulado = importe
+        else:
+            importe_acumulado += importe
+    
+    return cortes
+
+
+def _partir_por_cortes(filas_datos, importes, cortes):
+    """
+    Divide las filas en partes según los índices de corte; devuelve (partes, importe de cada parte).
+    """
+    limites = list(pairwise([0, *cortes, len(filas_datos)]))
+    partes = [filas_datos[inicio:fin] for inicio, fin in limites]
+    importes_partes = [math.fsum(importes[inicio:fin]) for inicio, fin in limites]
+    return partes, importes_partes
+
+
+def _leer_filas_csv(csv_file):
+    """
+    Lee un CSV de gastos (separado por ';', con o sin BOM) y devuelve sus filas una a una.
+    
+    El archivo se mapea en memoria y se recorre línea a línea sin copiarlo entero. Nuestros
+    exportadores no entrecomillan campos, así que cada línea se separa directamente por ';'.
+    Si una línea trae comillas, ese registro (que puede ocupar varias líneas) se lee con csv.reader.
+    """
+    with open(csv_file, 'rb') as f:
+        # mmap no admite archivos vacíos
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            if mapa[:3] == codecs.BOM_UTF8:
+                mapa.seek(3)
+            lineas = (linea.decode('utf-8') for linea in iter(mapa.readline, b''))
+            for linea in lineas:
+                if '"' in linea:
+                    yield next(csv.reader(chain((linea,), lineas), delimiter=';'))
+                    continue
+                linea = linea.rstrip('\r\n')
+                yield linea.split(';') if linea else []
+
+
+def _es_resumen(texto):
+    """
+    True si el texto lleva una marca de fila de resumen ('RESUMEN MENSUAL', 'Total 12-2025'...).
+    Un upper() y dos búsquedas de subcadena (en C) son bastante más rápidos que una regex con re.I.
+    """
+    texto = texto.upper()
+    return 'TOTAL' in texto or 'RESUMEN' in texto
+
+
+def _es_fila_resumen(fila):
+    """
+    True si la fila es de resumen. Los exportadores solo ponen la marca en la fecha (aliexpress)
+    o en el concepto (cnfans, 'TOTAL MES ...'), así que basta mirar esas dos columnas.
+    """
+    if len(fila) > 3:
+        return _es_resumen(fila[0]) or _es_resumen(fila[3])
+    return any(map(_es_resumen, fila))
+
+
+def _filas_de_gasto(filas):
+    """
+    Filtra al vuelo las filas de gasto: descarta filas vacías y las de resumen (TOTAL / RESUMEN).
+    
+    Los valores repetidos (proveedor, método, fechas...) se comparten como un único objeto: ocupan
+    menos memoria y se serializan una sola vez al enviar las partes a otros procesos.
+    """
+    valores = {}
+    compartir = valores.setdefault
+    for fila in filas:
+        if fila and fila[0] and not _es_resumen(fila[0]):
+            yield [compartir(celda, celda) for celda in fila]
+
+
+def _escribir_pdf(pdf_file, buffer):
+    """
+    Vuelca a disco de una sola vez un PDF generado en memoria.
+    """
+    with open(pdf_file, 'wb', buffering=0) as f:
+        f.write(buffer.getbuffer())
+
+
+def _ancho_texto(textos, fuente, font_size):
+    """Ancho en puntos del más ancho de los textos (0 si no hay ninguno)."""
+    return max((stringWidth(texto, fuente, font_size) for texto in textos), default=0)
+
+
+def _anchos_columnas(encabezado, cuerpo, ancho_disponible, font_size, filas_destacadas=(), fila_total=()):
+    """
+    Reparte el ancho disponible según el texto más ancho de cada columna (medido con la fuente con
+    que se dibuja). Si todo cabe, el sobrante se reparte en proporción. Si no, cada columna conserva
+    al menos el ancho de su encabezado y el resto se reparte empezando por las columnas más
+    estrechas, que lo reciben completo: solo se recortan las de texto más largo (el concepto),
+    nunca fechas, importes o referencias que quepan.
+    """
+    # Valores distintos de cada columna, en una sola pasada; las filas destacadas se miden aparte (negrita)
+    valores = [set() for _ in encabezado]
+    for i, fila in enumerate(cuerpo, 1):
+        if i not in filas_destacadas:
+            for conjunto, valor in zip(valores, fila):
+                conjunto.add(valor)
+    destacadas = [cuerpo[i - 1] for i in filas_destacadas]
+    
+    minimos = []
+    extras = []
+    for k, (titulo, conjunto) in enumerate(zip(encabezado, valores)):
+        ancho_titulo = stringWidth(titulo, 'Helvetica-Bold', font_size)
+        ancho_texto = max(
+            ancho_titulo,
+            _ancho_texto(conjunto, 'Helvetica', font_size),
+            _ancho_texto((fila[k] for fila in destacadas if len(fila) > k), 'Helvetica-Bold', font_size),
+            _ancho_texto(fila_total[k:k + 1], 'Helvetica-Bold', font_size + 1),
+        )
+        minimos.append(ancho_titulo + 2 * PADDING_CELDA)
+        extras.append(ancho_texto - ancho_titulo)
+    
+    sobrante = ancho_disponible - sum(minimos)
+    if sobrante <= 0:
+        # Ni los encabezados caben: se reparte en proporción a ellos
+        return [ancho_disponible * minimo / sum(minimos) for minimo in minimos]
+    
+    if sum(extras) <= sobrante:
+        # Cabe todo: cada columna crece en proporción a su texto
+        naturales = [minimo + extra for minimo, extra in zip(minimos, extras)]
+        total = sum(naturales)
+        return [ancho_disponible * ancho / total for ancho in naturales]
+    
+    # No cabe todo: de la columna con menos texto a la de más, cada una recibe lo que le falta
+    # hasta un tope que es la parte igual del sobrante que queda
+    anchos = list(minimos)
+    pendientes = sorted(range(len(extras)), key=extras.__getitem__)
+    for n, k in enumerate(pendientes):
+        extra = min(extras[k], sobrante / (len(pendientes) - n))
+        anchos[k] += extra
+        sobrante -= extra
+    return anchos
+
+
+@lru_cache(maxsize=8192)
+def _recortar(texto, ancho, fuente, font_size):
+    """
+    Recorta el texto con '…' para que mida como mucho ancho puntos con esa fuente. Se cachea porque
+    en los gastos se repiten muchos valores (proveedor, método, fechas...).
+    """
+    ancho += 1e-6  # margen para el redondeo de columnas que miden justo su texto
+    if stringWidth(texto, fuente, font_size) <= ancho:
+        return texto
+    # Búsqueda binaria del prefijo más largo que cabe junto con '…'
+    bajo, alto = 0, len(texto) - 1
+    while bajo < alto:
+        medio = (bajo + alto + 1) // 2
+        if stringWidth(texto[:medio] + '…', fuente, font_size) <= ancho:
+            bajo = medio
+        else:
+            alto = medio - 1
+    return texto[:bajo] + '…'
+
+
+def _recortar_celdas(fila, anchos_texto, fuente, font_size):
+    """
+    Recorta con '…' las celdas que no caben en su columna (en vez de WORDWRAP, que obliga a
+    reportlab a recalcular cada celda). anchos_texto es el ancho de cada columna sin el padding.
+    """
+    return [_recortar(celda, ancho, fuente, font_size) for celda, ancho in zip(fila, anchos_texto)]
+
+
+def _dibujar_tabla_canvas(c, encabezado, cuerpo, col_widths, font_size, pagesize, filas_destacadas=(), fila_total=None):
+    """
+    Dibuja la tabla directamente sobre el canvas (sin Platypus): encabezado azul repetido en cada
+    página, filas alternas en gris y rejilla.
+    
+    Args:
+        c: canvas de reportlab
+        encabezado: fila de encabezado (se repite en cada página)
+        cuerpo: filas de datos
+        col_widths: anchos de columna
+        font_size: tamaño de fuente
+        pagesize: tamaño de página
+        filas_destacadas: índices de filas a resaltar (TOTAL / RESUMEN), contando el encabezado como 0
+        fila_total: fila de TOTAL que cierra la tabla (resaltada y un punto más grande), opcional
+    """
+    margen = MARGEN
+    padding = PADDING_CELDA
+    alto_fila = ALTO_FILA
+    
+    # La fila de TOTAL se dibuja a continuación del cuerpo, sin copiarlo para añadirla
+    num_filas = len(cuerpo) + (fila_total is not None)
+    indice_total = num_filas if fila_total is not None else None
+    if fila_total is not None:
+        filas_destacadas = {*filas_destacadas, indice_total}
+    
+    # Línea base del texto centrado verticalmente (como VALIGN MIDDLE)
+    offset_texto = (alto_fila + LEADING_CELDA) / 2 - font_size
+    
+    # Bordes verticales de las columnas (x de cada celda = xs[i])
+    xs = list(accumulate(col_widths, initial=margen))
+    anchos_texto = [ancho - 2 * padding for ancho in col_widths]
+    encabezado_recortado = _recortar_celdas(encabezado, anchos_texto, 'Helvetica-Bold', font_size)
+    ancho_tabla = xs[-1] - xs[0]
+    y_tope = pagesize[1] - margen - PADDING_MARCO
+    filas_por_pagina = _filas_por_pagina(pagesize)
+    
+    for inicio in range(0, max(num_filas, 1), filas_por_pagina):
+        bloque = cuerpo[inicio:inicio + filas_por_pagina]
+        if indice_total is not None and inicio + filas_por_pagina >= num_filas:
+            bloque.append(fila_total)
+        indices = range(inicio + 1, inicio + 1 + len(bloque))
+        ys = [y_tope - k * alto_fila for k in range(len(bloque) + 2)]
+        
+        # Fondos: encabezado, filas alternas y filas destacadas
+        c.setFillColor(COLOR_ENCABEZADO)
+        c.rect(xs[0], ys[1], ancho_tabla, alto_fila, stroke=0, fill=1)
+        for i, y in zip(indices, ys[2:]):
+            if i in filas_destacadas:
+                c.setFillColor(COLOR_TOTAL)
+            elif i % 2 == 0:
+                c.setFillColor(COLOR_ALTERNO)
+            else:
+                continue
+            c.rect(xs[0], y, ancho_tabla, alto_fila, stroke=0, fill=1)
+        
+        # Texto del encabezado
+        c.setFillColor(colors.whitesmoke)
+        c.setFont('Helvetica-Bold', font_size)
+        for x, celda in zip(xs[:-1], encabezado_recortado):
+            c.drawString(x + padding, ys[1] + offset_texto, celda)
+        
+        # Texto de las filas
+        c.setFillColor(colors.black)
+        for i, fila, y in zip(indices, bloque, ys[2:]):
+            if i == indice_total:
+                fuente, tamaño = 'Helvetica-Bold', font_size + 1
+                y -= 1
+            else:
+                fuente, tamaño = ('Helvetica-Bold' if i in filas_destacadas else 'Helvetica'), font_size
+            c.setFont(fuente, tamaño)
+            for x, celda in zip(xs[:-1], _recortar_celdas(fila, anchos_texto, fuente, tamaño)):
+                c.drawString(x + padding, y + offset_texto, celda)
+        
+        # Rejilla de toda la página en una sola llamada
+        c.setStrokeColor(colors.grey)
+        c.setLineWidth(0.5)
+        c.grid(xs, ys)
+        c.showPage()
+
+
+def _render_pdf(pdf_filename, encabezado, cuerpo, pagesize=PAGINA_HORIZONTAL, filas_destacadas=(), fila_total=None):
+    """
+    Maqueta y escribe un PDF con la tabla encabezado + cuerpo (+ fila_total si se indica). Es el único
+    punto de generación de PDFs: calcula fuente y anchos de columna, dibuja en memoria y vuelca el
+    archivo de una vez. Devuelve el tamaño de fuente usado.
+    """
+    ancho_disponible = _ANCHO_UTIL[pagesize]
+    font_size = calcular_tamaño_fuente(len(encabezado), len(cuerpo) + 1 + (fila_total is not None), ancho_disponible)
+    col_widths = _anchos_columnas(encabezado, cuerpo, ancho_disponible, font_size, filas_destacadas, fila_total or ())
+    
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=pagesize)
+    _dibujar_tabla_canvas(c, encabezado, cuerpo, col_widths, font_size, pagesize, filas_destacadas, fila_total)
+    c.save()
+    _escribir_pdf(pdf_filename, buffer)
+    return font_size
 
 
-def csv_to_pdf(csv_file, pdf_file=None, orientacion='landscape'):
+def csv_to_pdf(csv_file, pdf_file=None, orientacion='landscape', force=False):
     """
     Convierte un archivo CSV a PDF.
     
@@ -27,6 +396,7 @@ def csv_to_pdf(csv_file, pdf_file=None, orientacion='landscape'):
         csv_file: Ruta del archivo CSV de entrada
         pdf_file: Ruta del archivo PDF de salida (opcional, se genera automáticamente si no se especifica)
         orientacion: 'landscape' (horizontal) o 'portrait' (vertical)
+        force: Si True, regenera el PDF aunque ya esté actualizado respecto al CSV
     """
     if not os.path.exists(csv_file):
         print(f"Error: No se encuentra el archivo '{csv_file}'")
@@ -35,86 +405,35 @@ def csv_to_pdf(csv_file, pdf_file=None, orientacion='landscape'):
     if pdf_file is None:
         pdf_file = csv_file.replace('.csv', '.pdf')
     
-    # Leer el CSV
-    with open(csv_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f, delimiter=';')
-        datos = list(reader)
+    # Si el PDF es más reciente que el CSV no hay nada que regenerar
+    if not force and os.path.exists(pdf_file) and os.path.getmtime(pdf_file) >= os.path.getmtime(csv_file):
+        print(f"✓ PDF ya actualizado, se omite: {pdf_file}")
+        return
+    
+    # Leer el CSV marcando a la vez las filas de TOTAL o RESUMEN (se resaltan)
+    filas = _leer_filas_csv(csv_file)
+    encabezado = next(filas, None)
     
-    if not datos:
+    if encabezado is None:
         print(f"Error: El archivo '{csv_file}' está vacío")
         return
     
-    # Configurar el tamaño de página
-    pagesize = landscape(A4) if orientacion == 'landscape' else A4
-    
-    # Crear el documento PDF
-    doc = SimpleDocTemplate(
-        pdf_file,
-        pagesize=pagesize,
-        leftMargin=10*mm,
-        rightMargin=10*mm,
-        topMargin=10*mm,
-        bottomMargin=10*mm
-    )
-    
-    # Dimensiones disponibles
-    ancho_disponible = pagesize[0] - 20*mm
-    alto_disponible = pagesize[1] - 20*mm
-    
-    num_columnas = len(datos[0]) if datos else 0
-    num_filas = len(datos)
-    
-    # Calcular tamaño de fuente
-    font_size = calcular_tamaño_fuente(num_columnas, num_filas, ancho_disponible)
-    
-    # Calcular anchos de columna proporcionales
-    ancho_columna = ancho_disponible / num_columnas if num_columnas > 0 else 50*mm
-    col_widths = [ancho_columna] * num_columnas
-    
-    # Crear la tabla
-    tabla = Table(datos, colWidths=col_widths, repeatRows=1)
-    
-    # Estilo de la tabla
-    estilo = TableStyle([
-        # Encabezado
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), font_size),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        
-        # Contenido
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), font_size),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F2F2F2')]),
-        
-        # Padding para que el texto respire
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        
-        # Word wrap automático
-        ('WORDWRAP', (0, 0), (-1, -1), True),
-    ])
+    cuerpo = []
+    filas_destacadas = set()
+    for i, fila in enumerate(filas, 1):
+        cuerpo.append(fila)
+        if fila and _es_fila_resumen(fila):
+            filas_destacadas.add(i)
     
-    # Aplicar estilo especial a filas de TOTAL o RESUMEN
-    for i, fila in enumerate(datos):
-        if any('TOTAL' in str(celda).upper() or 'RESUMEN' in str(celda).upper() for celda in fila):
-            estilo.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#FFE699'))
-            estilo.add('FONTNAME', (0, i), (-1, i), 'Helvetica-Bold')
+    # Configurar el tamaño de página
+    pagesize = PAGINA_HORIZONTAL if orientacion == 'landscape' else PAGINA_VERTICAL
     
-    tabla.setStyle(estilo)
+    num_columnas = len(encabezado)
+    num_filas = len(cuerpo) + 1
     
     # Construir el PDF
-    elementos = [tabla]
-    
     try:
-        doc.build(elementos)
+        font_size = _render_pdf(pdf_file, encabezado, cuerpo, pagesize, filas_destacadas)
         print(f"✓ PDF generado exitosamente: {pdf_file}")
         print(f"  - {num_filas} filas, {num_columnas} columnas")
         print(f"  - Tamaño de fuente: {font_size}")
@@ -132,8 +451,6 @@ def procesar_gastos_por_proveedor(csv_files, dividir=False, num_partes=2, metodo
         num_partes: Número de partes por proveedor
         metodo: 'importe' o 'registros'
     """
-    from datetime import datetime
-    
     for csv_file in csv_files:
         if not os.path.exists(csv_file):
             print(f"Advertencia: No se encuentra '{csv_file}', se omitirá.")
@@ -143,33 +460,17 @@ def procesar_gastos_por_proveedor(csv_files, dividir=False, num_partes=2, metodo
         print(f"Procesando: {csv_file}")
         print(f"{'='*60}\n")
         
-        # Leer CSV
-        with open(csv_file, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f, delimiter=';')
-            datos = list(reader)
+        # Leer CSV filtrando las filas según se leen
+        filas = _leer_filas_csv(csv_file)
+        encabezado = next(filas, None)
+        filas_datos = list(_filas_de_gasto(filas))
         
-        if not datos or len(datos) <= 1:
+        if not filas_datos:
             print(f"No hay datos en {csv_file}")
             continue
         
-        encabezado = datos[0]
-        filas_datos = [fila for fila in datos[1:] 
-                       if fila and any(fila) and 'RESUMEN' not in str(fila).upper() 
-                       and 'TOTAL' not in str(fila[0]).upper()]
-        
         # Ordenar por fecha
-        def parse_fecha(fila):
-            try:
-                fecha_str = fila[0]
-                if '/' in fecha_str:
-                    return datetime.strptime(fecha_str, "%d/%m/%Y")
-                elif '-' in fecha_str:
-                    return datetime.strptime(fecha_str, "%d-%m-%Y")
-            except:
-                pass
-            return datetime.min
-        
-        filas_datos.sort(key=parse_fecha, reverse=True)
+        _ordenar_por_fecha(filas_datos)
         
         # Extraer nombre del proveedor del CSV
         nombre_base = csv_file.replace('.csv', '').replace('gastos_', '').replace('_pedidos_gastos', '')
@@ -184,131 +485,95 @@ def procesar_gastos_por_proveedor(csv_files, dividir=False, num_partes=2, metodo
 
 def _dividir_y_generar_pdfs(encabezado, filas_datos, num_partes, metodo, prefijo_salida):
     """Función auxiliar para dividir y generar PDFs."""
-    def extraer_importe(fila):
-        try:
-            importe_str = fila[2].replace(',', '.').strip()
-            return float(importe_str)
-        except:
-            return 0.0
-    
-    importe_total = sum(extraer_importe(fila) for fila in filas_datos)
+    # Cada importe se convierte una sola vez y se reutiliza en totales y divisiones
+    importes = [_extraer_importe(fila) for fila in filas_datos]
+    importe_total = math.fsum(importes)
     print(f"Total de registros: {len(filas_datos)}")
     print(f"Importe total: {importe_total:.2f} €")
     
     # Dividir según el método
     if metodo == 'importe':
         print(f"Dividiendo por importe en {num_partes} partes...\n")
-        importe_por_parte = importe_total / num_partes
-        
-        partes = []
-        parte_actual = []
-        importe_acumulado = 0.0
-        
-        for fila in filas_datos:
-            importe_fila = extraer_importe(fila)
-            
-            if importe_acumulado + importe_fila > importe_por_parte and parte_actual and len(partes) < num_partes - 1:
-                partes.append(parte_actual)
-                parte_actual = [fila]
-                importe_acumulado = importe_fila
-            else:
-                parte_actual.append(fila)
-                importe_acumulado += importe_fila
-        
-        if parte_actual:
-            partes.append(parte_actual)
+        cortes = _cortes_por_importe(importes, num_partes, importe_total)
     
     else:  # metodo == 'registros'
         print(f"Dividiendo por registros en {num_partes} partes...\n")
         registros_por_parte = len(filas_datos) // num_partes
-        
-        partes = []
-        for i in range(num_partes):
-            inicio = i * registros_por_parte
-            fin = len(filas_datos) if i == num_partes - 1 else inicio + registros_por_parte
-            partes.append(filas_datos[inicio:fin])
+        cortes = [i * registros_por_parte for i in range(1, num_partes)]
+    
+    partes, importes_partes = _partir_por_cortes(filas_datos, importes, cortes)
     
     # Generar PDFs
-    for i, parte in enumerate(partes, 1):
-        importe_parte = sum(extraer_importe(fila) for fila in parte)
-        pdf_filename = f"{prefijo_salida}_{i}_de_{len(partes)}.pdf"
-        _generar_pdf_con_datos(encabezado, parte, pdf_filename, f"TOTAL", importe_parte)
-        print(f"✓ {pdf_filename} - {len(parte)} registros - {importe_parte:.2f} €")
+    for pdf_filename, parte, importe_parte, futuro in _generar_partes_en_paralelo(
+            encabezado, partes, importes_partes, prefijo_salida):
+        sin_cambios = "" if futuro.result() else " (sin cambios)"
+        print(f"✓ {pdf_filename} - {len(parte)} registros - {importe_parte:.2f} €{sin_cambios}")
 
 
 def _generar_pdf_unico(encabezado, filas_datos, pdf_filename):
     """Función auxiliar para generar un PDF único."""
-    def extraer_importe(fila):
-        try:
-            importe_str = fila[2].replace(',', '.').strip()
-            return float(importe_str)
-        except:
-            return 0.0
-    
-    importe_total = sum(extraer_importe(fila) for fila in filas_datos)
+    importe_total = math.fsum(map(_extraer_importe, filas_datos))
     print(f"Total de registros: {len(filas_datos)}")
     print(f"Importe total: {importe_total:.2f} €\n")
     
-    _generar_pdf_con_datos(encabezado, filas_datos, pdf_filename, "TOTAL", importe_total)
-    print(f"✓ {pdf_filename} - {len(filas_datos)} registros - {importe_total:.2f} €")
+    generado = _generar_pdf_con_datos(encabezado, filas_datos, pdf_filename, "TOTAL", importe_total)
+    sin_cambios = "" if generado else " (sin cambios)"
+    print(f"✓ {pdf_filename} - {len(filas_datos)} registros - {importe_total:.2f} €{sin_cambios}")
+
+
+def _huella_datos(encabezado, filas_datos, texto_total, importe_total):
+    """
+    Huella (sha1) del contenido de un PDF de gastos, para saber si ha cambiado desde la última vez.
+    """
+    huella = hashlib.sha1()
+    for fila in chain((encabezado,), filas_datos, ((texto_total, f"{importe_total:.2f}"),)):
+        huella.update('\x1f'.join(fila).encode('utf-8'))
+        huella.update(b'\x1e')
+    return huella.hexdigest()
 
 
 def _generar_pdf_con_datos(encabezado, filas_datos, pdf_filename, texto_total, importe_total):
-    """Función auxiliar que genera el PDF con los datos proporcionados."""
-    # Construir datos con encabezado, registros y total
-    datos_parte = [encabezado] + filas_datos
+    """
+    Función auxiliar que genera el PDF con los datos proporcionados.
     
-    # Añadir fila de TOTAL
+    Junto al PDF se guarda un '.stamp' con la huella de los datos; si el PDF existe y la huella
+    no ha cambiado no se vuelve a generar. Devuelve True si se ha generado.
+    """
+    stamp_file = pdf_filename + '.stamp'
+    huella = _huella_datos(encabezado, filas_datos, texto_total, importe_total)
+    try:
+        with open(stamp_file, 'r', encoding='ascii') as f:
+            if f.read() == huella and os.path.exists(pdf_filename):
+                return False
+    except OSError:
+        pass
+    
+    # Fila de TOTAL que cierra la tabla
     fila_total = [''] * len(encabezado)
     fila_total[2] = f"{importe_total:.2f}"
     fila_total[3] = texto_total
-    datos_parte.append(fila_total)
-    
-    # Generar PDF
-    pagesize = landscape(A4)
-    doc = SimpleDocTemplate(
-        pdf_filename,
-        pagesize=pagesize,
-        leftMargin=10*mm,
-        rightMargin=10*mm,
-        topMargin=10*mm,
-        bottomMargin=10*mm
-    )
-    
-    ancho_disponible = pagesize[0] - 20*mm
-    num_columnas = len(encabezado)
-    font_size = calcular_tamaño_fuente(num_columnas, len(datos_parte), ancho_disponible)
-    
-    ancho_columna = ancho_disponible / num_columnas
-    col_widths = [ancho_columna] * num_columnas
-    
-    tabla = Table(datos_parte, colWidths=col_widths, repeatRows=1)
-    
-    estilo = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), font_size),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), font_size),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F2F2F2')]),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ('WORDWRAP', (0, 0), (-1, -1), True),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FFE699')),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), font_size + 1),
-    ])
-    
-    tabla.setStyle(estilo)
-    doc.build([tabla])
+    
+    # Generar PDF (registros + fila de TOTAL)
+    _render_pdf(pdf_filename, encabezado, filas_datos, fila_total=fila_total)
+    
+    with open(stamp_file, 'w', encoding='ascii') as f:
+        f.write(huella)
+    return True
+
+
+def _generar_partes_en_paralelo(encabezado, partes, importes_partes, prefijo_salida):
+    """
+    Genera el PDF de cada parte en un proceso distinto (las partes son independientes).
+    Devuelve, en orden, (nombre del PDF, parte, importe, future) para informar del resultado.
+    """
+    num_partes = len(partes)
+    with ProcessPoolExecutor(max_workers=max(1, min(num_partes, os.cpu_count() or 1))) as executor:
+        tareas = []
+        for i, (parte, importe_parte) in enumerate(zip(partes, importes_partes), 1):
+            pdf_filename = f"{prefijo_salida}_{i}_de_{num_partes}.pdf"
+            futuro = executor.submit(_generar_pdf_con_datos, encabezado, parte, pdf_filename, "TOTAL", importe_parte)
+            tareas.append((pdf_filename, parte, importe_parte, futuro))
+        yield from tareas
 
 
 def dividir_gastos_en_pdfs(csv_files, num_partes=2, metodo='importe', prefijo_salida='gastos_parte'):
@@ -321,9 +586,8 @@ def dividir_gastos_en_pdfs(csv_files, num_partes=2, metodo='importe', prefijo_sa
         metodo: 'importe' para dividir por valor acumulado, 'registros' para dividir por cantidad
         prefijo_salida: Prefijo para los nombres de archivos PDF
     """
-    from datetime import datetime
-    
-    datos_combinados = []
+    encabezado = None
+    filas_datos = []
     
     # Leer todos los CSV
     for csv_file in csv_files:
@@ -332,167 +596,53 @@ def dividir_gastos_en_pdfs(csv_files, num_partes=2, metodo='importe', prefijo_sa
             continue
         
         print(f"Leyendo: {csv_file}")
-        with open(csv_file, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f, delimiter=';')
-            datos = list(reader)
-            
-            if not datos:
-                continue
-            
-            # Guardar encabezado
-            if not datos_combinados:
-                encabezado = datos[0]
-                datos_combinados.append(encabezado)
-            
-            # Añadir datos (sin encabezado, sin filas vacías, sin resúmenes)
-            for fila in datos[1:]:
-                if fila and any(fila) and 'RESUMEN' not in str(fila).upper() and 'TOTAL' not in str(fila[0]).upper():
-                    datos_combinados.append(fila)
-    
-    if len(datos_combinados) <= 1:
+        filas = _leer_filas_csv(csv_file)
+        encabezado_csv = next(filas, None)
+        
+        if encabezado_csv is None:
+            continue
+        
+        # Guardar el encabezado del primer CSV
+        if encabezado is None:
+            encabezado = encabezado_csv
+        
+        # Añadir datos según se leen (sin filas vacías, sin resúmenes)
+        filas_datos.extend(_filas_de_gasto(filas))
+    
+    if not filas_datos:
         print("No hay datos suficientes para dividir.")
         return
     
-    encabezado = datos_combinados[0]
-    filas_datos = datos_combinados[1:]
-    
     # Ordenar por fecha descendente
-    def parse_fecha(fila):
-        try:
-            fecha_str = fila[0]
-            if '/' in fecha_str:
-                return datetime.strptime(fecha_str, "%d/%m/%Y")
-            elif '-' in fecha_str:
-                return datetime.strptime(fecha_str, "%d-%m-%Y")
-        except:
-            pass
-        return datetime.min
-    
-    filas_datos.sort(key=parse_fecha, reverse=True)
-    
-    # Calcular el total de gastos
-    def extraer_importe(fila):
-        try:
-            # El importe está en la columna 2 (índice 2)
-            importe_str = fila[2].replace(',', '.').strip()
-            return float(importe_str)
-        except:
-            return 0.0
+    _ordenar_por_fecha(filas_datos)
     
-    importe_total = sum(extraer_importe(fila) for fila in filas_datos)
+    # Calcular el total de gastos (cada importe se convierte una sola vez)
+    importes = [_extraer_importe(fila) for fila in filas_datos]
+    importe_total = math.fsum(importes)
     print(f"\nTotal de registros: {len(filas_datos)}")
     print(f"Importe total: {importe_total:.2f} €")
     
     # Dividir según el método seleccionado
     if metodo == 'importe':
         print(f"\nDividiendo por importe en {num_partes} partes...")
-        importe_por_parte = importe_total / num_partes
-        
-        partes = []
-        parte_actual = []
-        importe_acumulado = 0.0
-        
-        for fila in filas_datos:
-            importe_fila = extraer_importe(fila)
-            
-            # Si añadir esta fila supera el límite y ya tenemos algo en la parte actual
-            if importe_acumulado + importe_fila > importe_por_parte and parte_actual and len(partes) < num_partes - 1:
-                partes.append(parte_actual)
-                parte_actual = [fila]
-                importe_acumulado = importe_fila
-            else:
-                parte_actual.append(fila)
-                importe_acumulado += importe_fila
-        
-        # Añadir la última parte
-        if parte_actual:
-            partes.append(parte_actual)
+        cortes = _cortes_por_importe(importes, num_partes, importe_total)
     
     else:  # metodo == 'registros'
         print(f"\nDividiendo por registros en {num_partes} partes...")
         registros_por_parte = len(filas_datos) // num_partes
-        
-        partes = []
-        for i in range(num_partes):
-            inicio = i * registros_por_parte
-            if i == num_partes - 1:
-                # Última parte toma todo lo que queda
-                fin = len(filas_datos)
-            else:
-                fin = inicio + registros_por_parte
-            
-            partes.append(filas_datos[inicio:fin])
+        # La última parte toma todo lo que queda
+        cortes = [i * registros_por_parte for i in range(1, num_partes)]
+    
+    partes, importes_partes = _partir_por_cortes(filas_datos, importes, cortes)
     
     # Generar un PDF por cada parte
     print(f"\nGenerando {len(partes)} PDFs...\n")
     
-    for i, parte in enumerate(partes, 1):
-        # Calcular importe de esta parte
-        importe_parte = sum(extraer_importe(fila) for fila in parte)
-        
-        # Construir datos con encabezado, registros y total
-        datos_parte = [encabezado] + parte
-        
-        # Añadir fila de TOTAL al final
-        fila_total = [''] * len(encabezado)
-        fila_total[0] = ''  # Fecha vacía
-        fila_total[1] = ''  # Proveedor vacío
-        fila_total[2] = f"{importe_parte:.2f}"  # Importe total
-        fila_total[3] = f"TOTAL"  # Concepto
-        datos_parte.append(fila_total)
-        
-        # Nombre del archivo
-        pdf_filename = f"{prefijo_salida}_{i}_de_{len(partes)}.pdf"
-        
-        # Generar PDF
-        pagesize = landscape(A4)
-        doc = SimpleDocTemplate(
-            pdf_filename,
-            pagesize=pagesize,
-            leftMargin=10*mm,
-            rightMargin=10*mm,
-            topMargin=10*mm,
-            bottomMargin=10*mm
-        )
-        
-        ancho_disponible = pagesize[0] - 20*mm
-        num_columnas = len(encabezado)
-        font_size = calcular_tamaño_fuente(num_columnas, len(datos_parte), ancho_disponible)
-        
-        ancho_columna = ancho_disponible / num_columnas
-        col_widths = [ancho_columna] * num_columnas
-        
-        tabla = Table(datos_parte, colWidths=col_widths, repeatRows=1)
-        
-        estilo = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), font_size),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), font_size),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F2F2F2')]),
-            ('LEFTPADDING', (0, 0), (-1, -1), 3),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ('WORDWRAP', (0, 0), (-1, -1), True),
-            # Estilo para la fila de TOTAL (última fila)
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FFE699')),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), font_size + 1),
-        ])
-        
-        tabla.setStyle(estilo)
-        
+    for i, (pdf_filename, parte, importe_parte, futuro) in enumerate(
+            _generar_partes_en_paralelo(encabezado, partes, importes_partes, prefijo_salida), 1):
         try:
-            doc.build([tabla])
-            print(f"✓ Parte {i}: {pdf_filename}")
+            sin_cambios = "" if futuro.result() else " (sin cambios)"
+            print(f"✓ Parte {i}: {pdf_filename}{sin_cambios}")
             print(f"  - {len(parte)} registros")
             print(f"  - Importe: {importe_parte:.2f} €")
         except Exception as e:
@@ -508,9 +658,8 @@ def combinar_csv_en_pdf(csv_files, pdf_output, titulo_pdf="Gastos Combinados"):
         pdf_output: Nombre del archivo PDF de salida
         titulo_pdf: Título para el PDF combinado
     """
-    from datetime import datetime
-    
-    datos_combinados = []
+    encabezado = None
+    filas_datos = []
     
     # Leer todos los CSV
     for csv_file in csv_files:
@@ -519,104 +668,55 @@ def combinar_csv_en_pdf(csv_files, pdf_output, titulo_pdf="Gastos Combinados"):
             continue
         
         print(f"Leyendo: {csv_file}")
-        with open(csv_file, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f, delimiter=';')
-            datos = list(reader)
-            
-            if not datos:
-                continue
-            
-            # Añadir encabezado solo la primera vez
-            if not datos_combinados:
-                datos_combinados.append(datos[0])
-            
-            # Añadir datos (sin encabezado, sin filas vacías, sin resúmenes)
-            for fila in datos[1:]:
-                # Filtrar filas vacías o de resumen
-                if fila and any(fila) and 'RESUMEN' not in str(fila).upper() and 'TOTAL' not in fila[0]:
-                    datos_combinados.append(fila)
-    
-    if len(datos_combinados) <= 1:
+        filas = _leer_filas_csv(csv_file)
+        encabezado_csv = next(filas, None)
+        
+        if encabezado_csv is None:
+            continue
+        
+        # Usar el encabezado del primer CSV
+        if encabezado is None:
+            encabezado = encabezado_csv
+        
+        # Añadir datos según se leen (sin filas vacías, sin resúmenes)
+        filas_datos.extend(_filas_de_gasto(filas))
+    
+    if not filas_datos:
         print("No hay datos suficientes para combinar.")
         return
     
     # Ordenar por fecha (asumiendo que la fecha está en la primera columna)
-    encabezado = datos_combinados[0]
-    filas_datos = datos_combinados[1:]
-    
-    def parse_fecha(fila):
-        try:
-            fecha_str = fila[0]
-            if '/' in fecha_str:
-                return datetime.strptime(fecha_str, "%d/%m/%Y")
-            elif '-' in fecha_str:
-                return datetime.strptime(fecha_str, "%d-%m-%Y")
-        except:
-            pass
-        return datetime.min
-    
-    filas_datos.sort(key=parse_fecha, reverse=True)
-    
-    # Reconstruir datos ordenados
-    datos_ordenados = [encabezado] + filas_datos
+    _ordenar_por_fecha(filas_datos)
+    num_filas = len(filas_datos) + 1
     
-    # Configurar el PDF
-    pagesize = landscape(A4)
-    doc = SimpleDocTemplate(
-        pdf_output,
-        pagesize=pagesize,
-        leftMargin=10*mm,
-        rightMargin=10*mm,
-        topMargin=10*mm,
-        bottomMargin=10*mm
-    )
-    
-    ancho_disponible = pagesize[0] - 20*mm
     num_columnas = len(encabezado)
-    font_size = calcular_tamaño_fuente(num_columnas, len(datos_ordenados), ancho_disponible)
-    
-    ancho_columna = ancho_disponible / num_columnas
-    col_widths = [ancho_columna] * num_columnas
-    
-    tabla = Table(datos_ordenados, colWidths=col_widths, repeatRows=1)
-    
-    estilo = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), font_size),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), font_size),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F2F2F2')]),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ('WORDWRAP', (0, 0), (-1, -1), True),
-    ])
-    
-    tabla.setStyle(estilo)
     
     try:
-        doc.build([tabla])
+        font_size = _render_pdf(pdf_output, encabezado, filas_datos)
         print(f"✓ PDF combinado generado exitosamente: {pdf_output}")
-        print(f"  - {len(datos_ordenados)} filas totales (incluyendo encabezado)")
+        print(f"  - {num_filas} filas totales (incluyendo encabezado)")
         print(f"  - {num_columnas} columnas")
         print(f"  - Tamaño de fuente: {font_size}")
     except Exception as e:
         print(f"Error al generar el PDF combinado: {e}")
 
 
+def _csv_to_pdf_con_informe(csv_file):
+    """
+    Ejecuta csv_to_pdf en un proceso del pool y devuelve lo que imprime, para que el proceso
+    principal lo muestre de una vez y no se mezcle con la salida de otros archivos.
+    """
+    informe = io.StringIO()
+    with contextlib.redirect_stdout(informe):
+        csv_to_pdf(csv_file)
+    return informe.getvalue()
+
+
 def convertir_todos_los_csv():
     """
     Busca y convierte todos los archivos CSV en el directorio actual.
     """
-    archivos_csv = [f for f in os.listdir('.') if f.endswith('.csv')]
+    archivos_csv = [e.name for e in os.scandir('.') if e.name.endswith('.csv') and e.is_file()]
     
     if not archivos_csv:
         print("No se encontraron archivos CSV en el directorio actual.")
@@ -624,10 +724,12 @@ def convertir_todos_los_csv():
     
     print(f"Se encontraron {len(archivos_csv)} archivo(s) CSV:\n")
     
-    for csv_file in archivos_csv:
-        print(f"Procesando: {csv_file}")
-        csv_to_pdf(csv_file)
-        print()
+    # Cada CSV es independiente: se convierten en paralelo, uno por proceso, y el informe de cada
+    # uno se imprime aquí según llega (en orden)
+    with ProcessPoolExecutor(max_workers=min(len(archivos_csv), os.cpu_count() or 1)) as executor:
+        for csv_file, informe in zip(archivos_csv, executor.map(_csv_to_pdf_con_informe, archivos_csv)):
+            print(f"Procesando: {csv_file}")
+            print(informe)
 
 
 if __name__ == "__main__":